@@ -0,0 +1,145 @@
+from datetime import datetime
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
+
+from models import OutstandingSummary
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Receivables aging buckets by days outstanding: 0-30, 31-60, 61-90, 90+
+AGING_BUCKETS = ['0-30', '31-60', '61-90', '90+']
+_BUCKET_EDGES = [float('-inf'), 30, 60, 90, float('inf')]
+
+
+def _month_order(month: str) -> datetime:
+    """Sort key for MMM-YYYY month labels."""
+    try:
+        return datetime.strptime(month, '%b-%Y')
+    except ValueError:
+        return datetime.max
+
+
+def _rows(frame: 'pd.DataFrame') -> Dict[str, List[float]]:
+    """Convert a frame indexed by name with one column per bucket to {name: [bucket values]}."""
+    return {str(name): [round(float(v), 2) for v in values] for name, values in zip(frame.index, frame.values)}
+
+
+def compute_aging(summaries: Dict[str, OutstandingSummary]) -> Dict[str, Any]:
+    """Compute aging bucket matrices for all months in one vectorized pass.
+
+    Returns bucket totals per month, per salesman and per area within each month,
+    plus the (salesman, area) detail rows used for drill-down.
+    """
+    months = sorted(summaries, key=_month_order)
+    records = [
+        (month, entry.salesman.strip(), entry.area.strip(), entry.balance, entry.days)
+        for month in months
+        for entry in summaries[month].entries
+    ]
+
+    if not records:
+        return {
+            'buckets': AGING_BUCKETS,
+            'months': months,
+            'by_month': {month: [0.0] * len(AGING_BUCKETS) for month in months},
+            'by_salesman': {month: {} for month in months},
+            'by_area': {month: {} for month in months},
+            'detail': {month: [] for month in months}
+        }
+
+    # pandas is slow to import, so keep it out of the app's cold start
+    import pandas as pd
+
+    df = pd.DataFrame.from_records(records, columns=['month', 'salesman', 'area', 'balance', 'days'])
+    df['bucket'] = pd.cut(df['days'], bins=_BUCKET_EDGES, labels=AGING_BUCKETS)
+
+    # Finest grain: month x salesman x area, one column per bucket
+    detail = df.pivot_table(
+        index=['month', 'salesman', 'area'],
+        columns='bucket',
+        values='balance',
+        aggfunc='sum',
+        fill_value=0.0,
+        observed=False
+    ).reindex(columns=AGING_BUCKETS, fill_value=0.0)
+    # Keep groups whose buckets offset each other (e.g. an old credit against new invoices)
+    detail = detail[(detail != 0).any(axis=1)]
+
+    by_month = detail.groupby(level='month').sum().reindex(months, fill_value=0.0)
+    by_salesman = detail.groupby(level=['month', 'salesman']).sum()
+    by_area = detail.groupby(level=['month', 'area']).sum()
+
+    def per_month(frame: 'pd.DataFrame') -> Dict[str, Dict[str, List[float]]]:
+        result = {month: {} for month in months}
+        for month, group in frame.groupby(level='month'):
+            result[month] = _rows(group.droplevel('month'))
+        return result
+
+    detail_rows = {month: [] for month in months}
+    for (month, salesman, area), values in zip(detail.index, detail.values):
+        detail_rows[month].append([salesman, area] + [round(float(v), 2) for v in values])
+
+    return {
+        'buckets': AGING_BUCKETS,
+        'months': months,
+        'by_month': _rows(by_month),
+        'by_salesman': per_month(by_salesman),
+        'by_area': per_month(by_area),
+        'detail': detail_rows
+    }
+
+
+def drill_down(
+    aging: Dict[str, Any],
+    month: Optional[str] = None,
+    salesman: Optional[str] = None,
+    area: Optional[str] = None
+) -> Dict[str, Any]:
+    """Aggregate cached aging detail rows for one month and/or salesman and/or area.
+
+    Without a month, buckets are summed across all months.
+    """
+    months = aging['months']
+    if month is not None and month not in months:
+        raise ValueError(f"No aging data for month: {month}")
+
+    salesman_key = salesman.strip().casefold() if salesman else None
+    area_key = area.strip().casefold() if area else None
+    width = len(aging['buckets'])
+
+    def add(target: Dict[str, List[float]], name: str, values: List[float]):
+        row = target.setdefault(name, [0.0] * width)
+        for i, value in enumerate(values):
+            row[i] += value
+
+    totals = [0.0] * width
+    by_month: Dict[str, List[float]] = {}
+    by_salesman: Dict[str, List[float]] = {}
+    by_area: Dict[str, List[float]] = {}
+
+    for m in ([month] if month else months):
+        for row_salesman, row_area, *values in aging['detail'].get(m, []):
+            if salesman_key and row_salesman.casefold() != salesman_key:
+                continue
+            if area_key and row_area.casefold() != area_key:
+                continue
+            add(by_month, m, values)
+            add(by_salesman, row_salesman, values)
+            add(by_area, row_area, values)
+            for i, value in enumerate(values):
+                totals[i] += value
+
+    def rounded(rows: Dict[str, List[float]]) -> Dict[str, List[float]]:
+        return {name: [round(v, 2) for v in values] for name, values in rows.items()}
+
+    return {
+        'buckets': aging['buckets'],
+        'months': months,
+        'month': month,
+        'salesman': salesman,
+        'area': area,
+        'totals': [round(v, 2) for v in totals],
+        'by_month': rounded(by_month),
+        'by_salesman': rounded(by_salesman),
+        'by_area': rounded(by_area)
+    }
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -20,3 +21,10 @@ API_PORT = int(os.getenv("API_PORT", 8000))
 
 # Frontend URL (for CORS)
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
+
+# Shared snapshot of synced data (read by every uvicorn worker)
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(tempfile.gettempdir(), "finance-reports"))
+# Send snapshot payloads to the ASGI server as memoryviews instead of bytes.
+# Only enable behind a server that accepts buffers (uvicorn's h11 protocol) and
+# without body-rewriting middleware such as GZip.
+ZERO_COPY_RESPONSES = os.getenv("ZERO_COPY_RESPONSES", "false").lower() == "true"
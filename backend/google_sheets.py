@@ -1,11 +1,10 @@
 import os
 import re
 import json
-from typing import List, Dict, Any, Optional, Tuple
-from google.auth.transport.requests import Request
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Tuple, Callable
 from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
 from config import GOOGLE_SHEET_ID, GOOGLE_CREDENTIALS_FILE, GOOGLE_TOKEN_FILE, SCOPES
@@ -14,17 +13,43 @@ from models import (
     SuspenseEntry, SuspenseSummary, OutstandingEntry, OutstandingSummary,
     SalesmanSummary, ComparisonData, DashboardKPIs, SheetInfo
 )
+from outstanding_index import OutstandingIndex
+from aging import compute_aging
+
+# Ranges read from each per-month tab, keyed by the tab's sheet type
+MONTH_TAB_RANGES = {
+    'banks': ['Banks_{month}!A3:G30'],
+    'advances': ['Advances_{month}!A3:G1000'],
+    'suspense': ['Suspense_{month}!A3:G1000'],
+    'outstanding': ['Outstanding_{month}!A4:D20', 'Outstanding_{month}!A19:H502']
+}
 
 
 class GoogleSheetsService:
     def __init__(self):
         self.creds = None
-        self.service = None
+        self._service = None
+        # Only set once authenticate() has fully succeeded
+        self._authenticated = False
+        # Token source last tried by the silent sign-in in is_authenticated()
+        self._token_source_tried = None
+        self._auth_lock = threading.Lock()
         self.sheet_id = GOOGLE_SHEET_ID
         self._cached_data = {}
-
-    def authenticate(self) -> bool:
-        """Authenticate with Google Sheets API."""
+        self._outstanding_indexes: Dict[str, Tuple[int, OutstandingIndex]] = {}
+        self._month_bundles: Dict[str, Tuple[int, Dict[str, bytes]]] = {}
+        self._aging: Optional[Tuple[int, Dict[str, Any]]] = None
+        # Per-thread switch making readers raise HttpError instead of returning empty data
+        self._strict_reads = threading.local()
+
+    def authenticate(self, interactive: bool = True) -> bool:
+        """Authenticate with Google Sheets API.
+
+        With interactive=False only a saved token is used; the browser OAuth flow
+        is never started.
+        """
+        self._authenticated = False
+        self._service = None
         try:
             # Try to load token from environment variable first (for Railway)
             token_json = os.getenv('GOOGLE_TOKEN_JSON')
@@ -36,12 +61,18 @@ class GoogleSheetsService:
 
             if not self.creds or not self.creds.valid:
                 if self.creds and self.creds.expired and self.creds.refresh_token:
+                    from google.auth.transport.requests import Request
                     self.creds.refresh(Request())
                     # Save refreshed token
                     if not os.getenv('GOOGLE_TOKEN_JSON'):
                         with open(GOOGLE_TOKEN_FILE, 'w') as token:
                             token.write(self.creds.to_json())
+                elif not interactive:
+                    return False
                 else:
+                    # The OAuth flow is only used locally, so import it on demand
+                    from google_auth_oauthlib.flow import InstalledAppFlow
+
                     # Try to get credentials from env or file
                     creds_json = os.getenv('GOOGLE_CREDENTIALS_JSON')
                     if creds_json:
@@ -60,15 +91,65 @@ class GoogleSheetsService:
                     with open(GOOGLE_TOKEN_FILE, 'w') as token:
                         token.write(self.creds.to_json())
 
-            self.service = build('sheets', 'v4', credentials=self.creds)
+            # The Sheets client itself is built lazily on first use
+            self._authenticated = True
             return True
         except Exception as e:
             print(f"Authentication error: {e}")
             return False
 
+    @property
+    def service(self):
+        """Sheets API client, built on first use from the bundled discovery document."""
+        if self._service is None and self._authenticated:
+            from googleapiclient.discovery import build
+            self._service = build(
+                'sheets', 'v4',
+                credentials=self.creds,
+                static_discovery=True,
+                cache_discovery=False
+            )
+        return self._service
+
+    @contextmanager
+    def _raising_upstream_errors(self):
+        """Make readers on this thread raise upstream errors instead of returning empty data."""
+        previous = getattr(self._strict_reads, 'enabled', False)
+        self._strict_reads.enabled = True
+        try:
+            yield
+        finally:
+            self._strict_reads.enabled = previous
+
+    def _check_upstream_error(self):
+        """Re-raise the HttpError being handled if readers should not swallow it."""
+        if getattr(self._strict_reads, 'enabled', False):
+            raise
+
+    def _token_source(self) -> Optional[Any]:
+        """Identify the saved token this process could sign in with, if there is one."""
+        if os.getenv('GOOGLE_TOKEN_JSON'):
+            return 'env'
+        try:
+            return os.stat(GOOGLE_TOKEN_FILE).st_mtime_ns
+        except OSError:
+            return None
+
     def is_authenticated(self) -> bool:
-        """Check if service is authenticated."""
-        return self.service is not None
+        """Check if service is authenticated.
+
+        Each worker process signs itself in from the saved token the first time it
+        is asked, and again whenever another worker writes a new token file.
+        """
+        if self._authenticated:
+            return True
+
+        with self._auth_lock:
+            source = self._token_source()
+            if not self._authenticated and source is not None and source != self._token_source_tried:
+                self._token_source_tried = source
+                self.authenticate(interactive=False)
+        return self._authenticated
 
     def get_sheet_names(self) -> List[SheetInfo]:
         """Get all sheet names from the spreadsheet."""
@@ -86,6 +167,7 @@ class GoogleSheetsService:
 
             return sheets
         except HttpError as e:
+            self._check_upstream_error()
             print(f"Error getting sheet names: {e}")
             return []
 
@@ -117,9 +199,30 @@ class GoogleSheetsService:
             ).execute()
             return result.get('values', [])
         except HttpError as e:
+            self._check_upstream_error()
             print(f"Error getting sheet data: {e}")
             return []
 
+    def _get_sheet_data_batch(self, ranges: List[str]) -> List[List[List[Any]]]:
+        """Get data from several ranges in a single request."""
+        if not self.service or not ranges:
+            return [[] for _ in ranges]
+
+        try:
+            result = self.service.spreadsheets().values().batchGet(
+                spreadsheetId=self.sheet_id,
+                ranges=ranges
+            ).execute()
+            value_ranges = result.get('valueRanges', [])
+            return [
+                value_ranges[i].get('values', []) if i < len(value_ranges) else []
+                for i in range(len(ranges))
+            ]
+        except HttpError as e:
+            self._check_upstream_error()
+            print(f"Error getting sheet data: {e}")
+            return [[] for _ in ranges]
+
     def _parse_number(self, value: Any) -> float:
         """Parse a number from various formats."""
         if value is None or value == '':
@@ -295,6 +398,26 @@ class GoogleSheetsService:
 
         # Get salesman summary (rows 4-18 approximately)
         summary_data = self._get_sheet_data(f'{sheet_name}!A4:D20')
+        # Get detailed entries (rows 19+)
+        entries_data = self._get_sheet_data(f'{sheet_name}!A19:H502')
+        return self._parse_monthly_outstanding(month, summary_data, entries_data)
+
+    def get_all_monthly_outstanding(self, months: List[str]) -> Dict[str, OutstandingSummary]:
+        """Get outstanding data for several months in one batched request."""
+        ranges = []
+        for month in months:
+            ranges.append(f'Outstanding_{month}!A4:D20')
+            ranges.append(f'Outstanding_{month}!A19:H502')
+
+        data = self._get_sheet_data_batch(ranges)
+        return {
+            month: self._parse_monthly_outstanding(month, data[2 * i], data[2 * i + 1])
+            for i, month in enumerate(months)
+        }
+
+    def _parse_monthly_outstanding(self, month: str, summary_data: List[List[Any]],
+                                   entries_data: List[List[Any]]) -> OutstandingSummary:
+        """Parse the salesman summary and entry rows of an Outstanding sheet."""
         salesman_summaries = []
         total_outstanding = 0
         total_customers = 0
@@ -314,8 +437,6 @@ class GoogleSheetsService:
                     average=self._parse_number(row[3]) if len(row) > 3 else 0
                 ))
 
-        # Get detailed entries (rows 19+)
-        entries_data = self._get_sheet_data(f'{sheet_name}!A19:H502')
         entries = []
 
         for row in entries_data[1:]:  # Skip header
@@ -342,6 +463,250 @@ class GoogleSheetsService:
             entries=entries
         )
 
+    def _parse_bank_row(self, row: List[Any]) -> BankEntry:
+        """Parse one row of a Banks sheet."""
+        return BankEntry(
+            bank_name=str(row[0]).strip(),
+            opening_balance=self._parse_number(row[1]) if len(row) > 1 else 0,
+            total_received=self._parse_number(row[2]) if len(row) > 2 else 0,
+            bank_charges=self._parse_number(row[3]) if len(row) > 3 else 0,
+            total_payments=self._parse_number(row[4]) if len(row) > 4 else 0,
+            closing_balance=self._parse_number(row[5]) if len(row) > 5 else 0,
+            notes=str(row[6]) if len(row) > 6 else ''
+        )
+
+    def _parse_monthly_banks(self, month: str, data: List[List[Any]]) -> BankSummary:
+        """Parse a Banks sheet (rows 3+): SAR accounts, USD accounts and totals."""
+        banks = []
+        usd_accounts = []
+        sub_total_sar = BankEntry(bank_name='SUB-TOTAL SAR')
+        sub_total_usd = BankEntry(bank_name='SUB-TOTAL USD')
+        grand_total = BankEntry(bank_name='GRAND TOTAL')
+        in_usd = False
+
+        for row in data:
+            if not row or not row[0]:
+                continue
+            name = str(row[0]).strip()
+            if name == 'Bank Name':
+                continue
+            elif name == 'SUMMARY':
+                break
+            elif name == 'USD ACCOUNTS':
+                in_usd = True
+            elif name == 'SUB-TOTAL SAR':
+                sub_total_sar = self._parse_bank_row(row)
+            elif name == 'SUB-TOTAL USD':
+                sub_total_usd = self._parse_bank_row(row)
+            elif name.startswith('GRAND TOTAL'):
+                grand_total = self._parse_bank_row(row)
+            elif in_usd:
+                usd_accounts.append(self._parse_bank_row(row))
+            else:
+                banks.append(self._parse_bank_row(row))
+
+        return BankSummary(
+            month=month,
+            banks=banks,
+            sub_total_sar=sub_total_sar,
+            usd_accounts=usd_accounts,
+            sub_total_usd=sub_total_usd,
+            grand_total=grand_total
+        )
+
+    def _transaction_rows(self, data: List[List[Any]]) -> List[List[Any]]:
+        """Rows between the 'Date' header and the TOTAL row of a reconciliation sheet."""
+        rows = []
+        in_transactions = False
+
+        for row in data:
+            if not row:
+                continue
+            first = str(row[0]).strip()
+            if not in_transactions:
+                in_transactions = first == 'Date'
+                continue
+            if first == 'TOTAL':
+                break
+            if any(str(cell).strip() for cell in row):
+                rows.append(row)
+
+        return rows
+
+    def _parse_monthly_advances(self, month: str, data: List[List[Any]]) -> AdvanceSummary:
+        """Parse an Advances sheet (rows 3+): opening/closing balances and transactions."""
+        header = data[0] if data else []
+        transactions = [
+            AdvanceEntry(
+                date=str(row[0]) if len(row) > 0 else '',
+                voucher_no=str(row[1]) if len(row) > 1 else '',
+                description=str(row[2]) if len(row) > 2 else '',
+                person_party=str(row[3]) if len(row) > 3 else '',
+                advance_given=self._parse_number(row[4]) if len(row) > 4 else 0,
+                amount_settled=self._parse_number(row[5]) if len(row) > 5 else 0,
+                running_balance=self._parse_number(row[6]) if len(row) > 6 else 0
+            )
+            for row in self._transaction_rows(data)
+        ]
+
+        return AdvanceSummary(
+            month=month,
+            opening_balance=self._parse_number(header[1]) if len(header) > 1 else 0,
+            closing_balance=self._parse_number(header[4]) if len(header) > 4 else 0,
+            transactions=transactions,
+            total_given=sum(t.advance_given for t in transactions),
+            total_settled=sum(t.amount_settled for t in transactions)
+        )
+
+    def _parse_monthly_suspense(self, month: str, data: List[List[Any]]) -> SuspenseSummary:
+        """Parse a Suspense sheet (rows 3+): opening/closing balances and transactions."""
+        header = data[0] if data else []
+        transactions = [
+            SuspenseEntry(
+                date=str(row[0]) if len(row) > 0 else '',
+                journal_no=str(row[1]) if len(row) > 1 else '',
+                description=str(row[2]) if len(row) > 2 else '',
+                reference=str(row[3]) if len(row) > 3 else '',
+                debit=self._parse_number(row[4]) if len(row) > 4 else 0,
+                credit=self._parse_number(row[5]) if len(row) > 5 else 0,
+                running_balance=self._parse_number(row[6]) if len(row) > 6 else 0
+            )
+            for row in self._transaction_rows(data)
+        ]
+
+        return SuspenseSummary(
+            month=month,
+            opening_balance=self._parse_number(header[1]) if len(header) > 1 else 0,
+            closing_balance=self._parse_number(header[4]) if len(header) > 4 else 0,
+            transactions=transactions,
+            total_debit=sum(t.debit for t in transactions),
+            total_credit=sum(t.credit for t in transactions)
+        )
+
+    def _month_tabs(self, sheets: List[SheetInfo]) -> Dict[str, List[str]]:
+        """Map each month to the per-month tabs (sheet types) the spreadsheet has for it."""
+        tabs: Dict[str, List[str]] = {}
+        for sheet in sheets:
+            if sheet.month and sheet.sheet_type in MONTH_TAB_RANGES:
+                tabs.setdefault(sheet.month, []).append(sheet.sheet_type)
+        return tabs
+
+    def _get_month_sections(self, tabs: Dict[str, List[str]]) -> Dict[str, Dict[str, Any]]:
+        """Read and parse the given months' tabs in one batched request.
+
+        Only tabs that exist are requested, since Sheets fails the whole batch on
+        a missing one; a month without a given tab gets an empty summary for it.
+        """
+        ranges = [
+            template.format(month=month)
+            for month, types in tabs.items()
+            for sheet_type, templates in MONTH_TAB_RANGES.items() if sheet_type in types
+            for template in templates
+        ]
+        data = iter(self._get_sheet_data_batch(ranges))
+
+        sections = {}
+        for month, types in tabs.items():
+            values = {
+                sheet_type: [next(data) if sheet_type in types else [] for _ in templates]
+                for sheet_type, templates in MONTH_TAB_RANGES.items()
+            }
+            sections[month] = {
+                'banks': self._parse_monthly_banks(month, *values['banks']),
+                'advances': self._parse_monthly_advances(month, *values['advances']),
+                'suspense': self._parse_monthly_suspense(month, *values['suspense']),
+                'outstanding': self._parse_monthly_outstanding(month, *values['outstanding'])
+            }
+        return sections
+
+    def get_month_bundle(self, month: str, version: int = 0,
+                         sheets: Optional[List[SheetInfo]] = None) -> Optional[Dict[str, bytes]]:
+        """Get a month's Banks, Advances, Suspense and Outstanding tabs (None if there are none).
+
+        `sheets` is the known list of tabs, looked up from the spreadsheet if not
+        given. All of the month's tabs are fetched in one batched request and kept
+        as serialized JSON per section until the version changes. The parsed
+        Outstanding data also seeds the index used by get_outstanding_index().
+        """
+        cached = self._month_bundles.get(month)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        try:
+            with self._raising_upstream_errors():
+                if sheets is None:
+                    sheets = self.get_sheet_names()
+                tabs = self._month_tabs(sheets).get(month)
+                if not tabs:
+                    return None
+                sections = self._get_month_sections({month: tabs})[month]
+        except HttpError as e:
+            # A tab deleted since the sheet list was read makes Sheets reject the batch with a 400
+            if e.resp.status == 400:
+                return None
+            raise
+
+        bundle = {name: json.dumps(model.dict()).encode('utf-8') for name, model in sections.items()}
+
+        self._month_bundles[month] = (version, bundle)
+        if 'outstanding' in tabs:
+            self._outstanding_indexes[month] = (version, OutstandingIndex(sections['outstanding'], version))
+        return bundle
+
+    def get_outstanding_index(self, month: str, version: int = 0,
+                              published: Optional[Callable] = None) -> Optional[OutstandingIndex]:
+        """Get indexed outstanding data for a month (None if there is no such tab).
+
+        The index is reused until the version changes. It is built from the synced
+        summary returned by `published` when there is one, and otherwise fetched,
+        raising upstream errors rather than indexing an empty month.
+        """
+        cached = self._outstanding_indexes.get(month)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        summary = published() if published is not None else None
+        if summary is not None:
+            index = OutstandingIndex(OutstandingSummary(**summary), version)
+            self._outstanding_indexes[month] = (version, index)
+            return index
+
+        sheet_name = f'Outstanding_{month}'
+        try:
+            with self._raising_upstream_errors():
+                summary_data, entries_data = self._get_sheet_data_batch([
+                    f'{sheet_name}!A4:D20',
+                    f'{sheet_name}!A19:H502'
+                ])
+        except HttpError as e:
+            # Sheets rejects ranges on tabs that don't exist with a 400
+            if e.resp.status == 400:
+                return None
+            raise
+
+        index = OutstandingIndex(self._parse_monthly_outstanding(month, summary_data, entries_data), version)
+        self._outstanding_indexes[month] = (version, index)
+        return index
+
+    def get_aging(self, months: Optional[List[str]] = None, version: int = 0) -> Dict[str, Any]:
+        """Get receivables aging buckets for all (or the given) months.
+
+        Aging for all months is reused until the version changes. Upstream errors
+        are raised rather than computing aging from empty data.
+        """
+        if months is None and self._aging is not None and self._aging[0] == version:
+            return self._aging[1]
+
+        with self._raising_upstream_errors():
+            names = months
+            if names is None:
+                names = [s.month for s in self.get_sheet_names() if s.sheet_type == 'outstanding' and s.month]
+            aging = compute_aging(self.get_all_monthly_outstanding(names))
+
+        if months is None:
+            self._aging = (version, aging)
+        return aging
+
     def sync_all_data(self) -> Dict[str, Any]:
         """Sync all data from Google Sheets."""
         if not self.is_authenticated():
@@ -349,13 +714,25 @@ class GoogleSheetsService:
                 return {'success': False, 'error': 'Authentication failed'}
 
         try:
-            sheets = self.get_sheet_names()
-            dashboard = self.get_dashboard_kpis()
-            banks = self.get_banks_comparison()
-            advances = self.get_advances_comparison()
-            suspense = self.get_suspense_comparison()
-            outstanding = self.get_outstanding_comparison()
-            settings = self.get_settings()
+            # A failed read must fail the sync, not publish empty data over a good snapshot
+            with self._raising_upstream_errors():
+                sheets = self.get_sheet_names()
+                if not sheets:
+                    return {'success': False, 'error': 'No sheets found in the spreadsheet'}
+
+                dashboard = self.get_dashboard_kpis()
+                banks = self.get_banks_comparison()
+                advances = self.get_advances_comparison()
+                suspense = self.get_suspense_comparison()
+                outstanding = self.get_outstanding_comparison()
+                settings = self.get_settings()
+                # Every month's tabs in one batch, which also feeds the aging buckets
+                month_tabs = self._month_tabs(sheets)
+                months = self._get_month_sections(month_tabs)
+                aging = compute_aging({
+                    month: sections['outstanding'] for month, sections in months.items()
+                    if 'outstanding' in month_tabs[month]
+                })
 
             self._cached_data = {
                 'sheets': sheets,
@@ -364,8 +741,13 @@ class GoogleSheetsService:
                 'advances_comparison': advances,
                 'suspense_comparison': suspense,
                 'outstanding_comparison': outstanding,
-                'settings': settings
+                'settings': settings,
+                'aging': aging,
+                'months': months
             }
+            self._outstanding_indexes = {}
+            self._month_bundles = {}
+            self._aging = None
 
             return {
                 'success': True,
@@ -0,0 +1,426 @@
+"""
+Load test for the API against a local stand-in for Google Sheets.
+Run with: python loadtest.py --clients 20 --duration 30 --latency 0.15
+
+The app from main.py is driven in-process over ASGI by concurrent async clients
+issuing a month-end mix of dashboard, comparison, monthly outstanding, month
+bundle, salesman, aging and sync requests. The fake Sheets backend serves a
+generated workbook with the same layout as the real one, with configurable
+latency and quota errors.
+"""
+import os
+import re
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+import contextvars
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Tuple
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+MONTH_NAMES = ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC']
+SALESMEN = ['Nidheesh', 'Jaseel', 'Bassam', 'akmal', 'arshad', 'Shameer riyadh',
+            'company sales', 'shafi', 'ashik', 'dhiya', 'salman', 'samir']
+AREAS = ['Al Ahsa-1', 'Al Ahsa-2', 'Dammam', 'Riyadh', 'Qassim', 'Khobar']
+BANKS = ['Alrajhi-1097', 'Alrajhi-new', 'SNB Al Ahsa Branch', 'Albilad']
+
+# Request kind of the request currently being served, for attributing upstream calls
+_current_kind: contextvars.ContextVar[str] = contextvars.ContextVar('current_kind', default='other')
+
+
+def _column_index(letters: str) -> int:
+    """Convert a column label (A, B, ..., AA) to a zero-based index."""
+    index = 0
+    for char in letters:
+        index = index * 26 + ord(char) - ord('A') + 1
+    return index - 1
+
+
+def _fmt(value: float) -> str:
+    """Format a number the way Sheets returns formatted values."""
+    return f"{value:,.2f}"
+
+
+class FakeWorkbook:
+    """Generated workbook with the same sheet layouts as the real report."""
+
+    def __init__(self, months: int, customers: int, seed: int = 0):
+        rng = random.Random(seed)
+        self.months = [f"{MONTH_NAMES[i % 12]}-{2025 + i // 12}" for i in range(months)]
+        self.sheets: Dict[str, List[List[Any]]] = {}
+
+        outstanding_totals: Dict[str, List[float]] = defaultdict(list)
+        for month in self.months:
+            rows = self._outstanding_sheet(rng, month, customers)
+            self.sheets[f'Outstanding_{month}'] = rows
+            self.sheets[f'Banks_{month}'] = self._banks_sheet(rng, month)
+            self.sheets[f'Advances_{month}'] = self._reconciliation_sheet(
+                rng, f'ADVANCE RECONCILIATION - {month}', 'TRANSACTIONS',
+                ['Date', 'Voucher No', 'Description', 'Person/Party', 'Advance Given', 'Amount Settled',
+                 'Running Balance'], 'EXP', customers // 4)
+            self.sheets[f'Suspense_{month}'] = self._reconciliation_sheet(
+                rng, f'SUSPENSE RECONCILIATION - {month}', 'UNIDENTIFIED TRANSACTIONS',
+                ['Date', 'Journal No', 'Description', 'Reference', 'Debit', 'Credit', 'Running Balance'],
+                'JN', customers // 2)
+            for row in rows[3:3 + len(SALESMEN)]:
+                outstanding_totals[row[0]].append(float(row[1].replace(',', '')))
+
+        n = len(self.months)
+        self.sheets['Banks_Comparison'] = self._comparison_sheet(rng, 'BANKS', [
+            'Opening Balance', 'Total Received', 'Bank Charges', 'Total Payments',
+            'Closing Balance', 'Net Cash Flow', 'Month-over-Month %'], n)
+        self.sheets['Advances_Comparison'] = self._comparison_sheet(rng, 'ADVANCES', [
+            'Opening Balance', 'Advances Given', 'Advances Settled', 'Closing Balance'], n)
+        self.sheets['Suspense_Comparison'] = self._comparison_sheet(rng, 'SUSPENSE', [
+            'Opening Balance', 'Total Debits', 'Total Credits', 'Closing Balance'], n)
+
+        comparison = [['OUTSTANDING - MONTHLY COMPARISON'], [], ['Salesman', 'Trend'] + self.months]
+        for salesman in SALESMEN:
+            comparison.append([salesman, ''] + [_fmt(v) for v in outstanding_totals[salesman]])
+        totals = [sum(outstanding_totals[s][i] for s in SALESMEN) for i in range(n)]
+        comparison.append(['TOTAL', ''] + [_fmt(v) for v in totals])
+        comparison.append(['MoM Change', ''] + ['' for _ in totals])
+        self.sheets['Outstanding_Comparison'] = comparison
+
+        settings = [[] for _ in range(13)]
+        settings.append(['BANKS', '', 'SALESMEN', '', 'AREAS'])
+        for i in range(max(len(BANKS), len(SALESMEN), len(AREAS))):
+            settings.append([
+                BANKS[i] if i < len(BANKS) else '', '',
+                SALESMEN[i] if i < len(SALESMEN) else '', '',
+                AREAS[i] if i < len(AREAS) else ''
+            ])
+        self.sheets['Settings'] = settings
+        self.sheets['Dashboard'] = [['EXECUTIVE DASHBOARD']]
+
+    def _comparison_sheet(self, rng: random.Random, title: str, metrics: List[str], n: int) -> List[List[Any]]:
+        rows = [[f'{title} - MONTHLY COMPARISON'], [], ['Metric'] + self.months]
+        for metric in metrics:
+            rows.append([metric] + [_fmt(rng.uniform(1e4, 5e6)) for _ in range(n)])
+        return rows
+
+    def _banks_sheet(self, rng: random.Random, month: str) -> List[List[Any]]:
+        def account(name: str) -> List[Any]:
+            opening, received, charges = rng.uniform(1e5, 2e6), rng.uniform(1e5, 3e6), rng.uniform(0, 5e3)
+            payments = rng.uniform(0, opening + received)
+            return [name, _fmt(opening), _fmt(received), _fmt(charges), _fmt(payments),
+                    _fmt(opening + received - charges - payments)]
+
+        def total(name: str, rows: List[List[Any]]) -> List[Any]:
+            return [name] + [_fmt(sum(float(r[i].replace(',', '')) for r in rows)) for i in range(1, 6)]
+
+        sar = [account(bank) for bank in BANKS]
+        usd = [account('Albilad USD')]
+        return [
+            [f'BANK SUMMARY - {month}'], [],
+            ['Bank Name', 'Opening Balance', 'Total Received', 'Bank Charges', 'Total Payments',
+             'Closing Balance', 'Notes'],
+            *sar, [], total('SUB-TOTAL SAR', sar), [], ['USD ACCOUNTS'],
+            ['Bank Name', 'Opening', 'Amount Received', 'Bank Charge', 'Payment', 'Balance', 'Notes'],
+            *usd, [], total('SUB-TOTAL USD', usd), [], total('GRAND TOTAL (SAR + USD Converted)', sar + usd),
+            [], ['SUMMARY']
+        ]
+
+    def _reconciliation_sheet(self, rng: random.Random, title: str, section: str, header: List[str],
+                              prefix: str, count: int) -> List[List[Any]]:
+        opening = rng.uniform(-1e5, 5e5)
+        balance = opening
+        transactions = []
+        for i in range(count):
+            debit = rng.uniform(0, 5e3) if rng.random() < 0.5 else 0.0
+            credit = 0.0 if debit else rng.uniform(0, 5e3)
+            balance += debit - credit
+            transactions.append([f'{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025', f'{prefix}{i}',
+                                 f'Transaction {i}', '', _fmt(debit), _fmt(credit), _fmt(balance)])
+        return [
+            [title], [], ['OPENING BALANCE', _fmt(opening), '', 'CLOSING BALANCE', _fmt(balance)],
+            [], [section], header, *transactions, [], ['TOTAL']
+        ]
+
+    def _outstanding_sheet(self, rng: random.Random, month: str, customers: int) -> List[List[Any]]:
+        entries = []
+        for i in range(customers):
+            invoice = round(rng.uniform(50, 20000), 2)
+            paid = round(invoice * rng.choice([0, 0, 0.25, 0.5]), 2)
+            entries.append([
+                f'CUST{i}', f'Customer {i}', rng.choice(AREAS), rng.choice(SALESMEN),
+                _fmt(invoice), _fmt(paid) if paid else '', _fmt(invoice - paid), str(rng.randint(0, 180))
+            ])
+
+        per_salesman: Dict[str, List[float]] = defaultdict(list)
+        for entry in entries:
+            per_salesman[entry[3]].append(float(entry[6].replace(',', '')))
+
+        rows = [[f'CUSTOMER OUTSTANDING - {month}'], [],
+                ['Salesman', 'Total Outstanding', 'No. of Customers', 'Average']]
+        for salesman in SALESMEN:
+            balances = per_salesman[salesman]
+            total = sum(balances)
+            rows.append([salesman, _fmt(total), str(len(balances)),
+                         _fmt(total / len(balances)) if balances else '0'])
+        grand_total = sum(sum(b) for b in per_salesman.values())
+        rows.append(['TOTAL', _fmt(grand_total), str(len(entries)), _fmt(grand_total / max(len(entries), 1))])
+        while len(rows) < 17:
+            rows.append([])
+        rows.append(['Customer Code', 'Customer Name', 'Area', 'Salesman',
+                     'Invoice Amount', 'Paid Amount', 'Balance', 'Days'])
+        rows.extend(entries)
+        return rows
+
+    def read(self, range_name: str) -> List[List[Any]]:
+        """Read an A1 range, trimming trailing empty rows and cells like the Sheets API."""
+        match = re.fullmatch(r"'?(.+?)'?!([A-Z]+)(\d+):([A-Z]+)(\d+)", range_name)
+        if not match:
+            raise ValueError(f"Unsupported range: {range_name}")
+
+        sheet, col1, row1, col2, row2 = match.groups()
+        if sheet not in self.sheets:
+            raise HttpError(httplib2.Response({'status': 400}), b'Unable to parse range')
+
+        c1, c2 = _column_index(col1), _column_index(col2)
+        values = []
+        for row in self.sheets[sheet][int(row1) - 1:int(row2)]:
+            cells = list(row[c1:c2 + 1])
+            while cells and cells[-1] in ('', None):
+                cells.pop()
+            values.append(cells)
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+
+class FakeSheetsBackend:
+    """Stand-in for the googleapiclient Sheets resource used by GoogleSheetsService."""
+
+    def __init__(self, workbook: FakeWorkbook, latency: float = 0.1, quota_error_rate: float = 0.0,
+                 seed: int = 0):
+        self.workbook = workbook
+        self.latency = latency
+        self.quota_error_rate = quota_error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.quota_errors = 0
+
+    def _call(self, handler):
+        """Simulate one upstream round trip, blocking like the real client does."""
+        with self._lock:
+            self.calls[_current_kind.get()] += 1
+            throttled = self._rng.random() < self.quota_error_rate
+            if throttled:
+                self.quota_errors += 1
+
+        time.sleep(self.latency)
+        if throttled:
+            raise HttpError(httplib2.Response({'status': 429, 'reason': 'Too Many Requests'}),
+                            b'Quota exceeded for quota metric')
+        return handler()
+
+    # The chained resource API: service.spreadsheets().values().get(...).execute()
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def get(self, spreadsheetId: str, range: Optional[str] = None, **kwargs):
+        if range is None:
+            sheets = [{'properties': {'title': name}} for name in self.workbook.sheets]
+            return _Request(lambda: self._call(lambda: {'sheets': sheets}))
+        return _Request(lambda: self._call(lambda: {'range': range, 'values': self.workbook.read(range)}))
+
+    def batchGet(self, spreadsheetId: str, ranges: List[str], **kwargs):
+        return _Request(lambda: self._call(lambda: {
+            'valueRanges': [{'range': r, 'values': self.workbook.read(r)} for r in ranges]
+        }))
+
+
+class _Request:
+    def __init__(self, execute):
+        self.execute = execute
+
+
+class ASGIClient:
+    """Minimal in-process HTTP client for an ASGI app."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method: str, path: str) -> Tuple[int, bytes]:
+        path, _, query = path.partition('?')
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query.encode(),
+            'root_path': '',
+            'headers': [(b'host', b'loadtest')],
+            'client': ('127.0.0.1', 0),
+            'server': ('loadtest', 80),
+        }
+        status = 0
+        body = []
+        request_sent = False
+        response_done = asyncio.Event()
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await response_done.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif message['type'] == 'http.response.body':
+                body.append(message.get('body', b''))
+                if not message.get('more_body', False):
+                    response_done.set()
+
+        await self.app(scope, receive, send)
+        return status, b''.join(body)
+
+
+def _traffic(workbook: FakeWorkbook, sync_weight: float) -> List[Tuple[str, str, str, float]]:
+    """(kind, method, path, weight) for a month-end mix of requests."""
+    latest = workbook.months[-1]
+    traffic = [
+        ('dashboard', 'GET', '/api/dashboard', 25),
+        ('comparison', 'GET', '/api/comparison/banks', 6),
+        ('comparison', 'GET', '/api/comparison/advances', 4),
+        ('comparison', 'GET', '/api/comparison/suspense', 4),
+        ('comparison', 'GET', '/api/comparison/outstanding', 8),
+        ('outstanding', 'GET', f'/api/outstanding/{latest}', 6),
+        ('aging', 'GET', '/api/aging', 5),
+        ('month', 'GET', f'/api/month/{latest}', 6),
+    ]
+    for salesman in SALESMEN[:4]:
+        quoted = salesman.replace(' ', '%20')
+        traffic.append(('outstanding', 'GET', f'/api/outstanding/{latest}?salesman={quoted}&sort=-days&limit=50', 4))
+        traffic.append(('salesman', 'GET', f'/api/reports/salesman/{quoted}', 4))
+    traffic.append(('sync', 'POST', '/api/sync', sync_weight))
+    return traffic
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+async def _run(args) -> Dict[str, Any]:
+    # The snapshot directory is read at import time, so point it somewhere fresh first
+    # and remove it once the run is over
+    with tempfile.TemporaryDirectory(prefix='finance-reports-loadtest-') as snapshot_dir:
+        os.environ['SNAPSHOT_DIR'] = snapshot_dir
+        return await _drive(args)
+
+
+async def _drive(args) -> Dict[str, Any]:
+    from main import app
+    from google_sheets import sheets_service
+
+    workbook = FakeWorkbook(args.months, args.customers, seed=args.seed)
+    backend = FakeSheetsBackend(workbook, latency=args.latency,
+                                quota_error_rate=args.quota_error_rate, seed=args.seed)
+    sheets_service.creds = object()
+    sheets_service._authenticated = True
+    sheets_service._service = backend
+
+    client = ASGIClient(app)
+    if not args.cold:
+        _current_kind.set('warmup')
+        status, _ = await client.request('POST', '/api/sync')
+        if status != 200:
+            print(f"Warm-up sync failed with status {status}", file=sys.stderr)
+
+    traffic = _traffic(workbook, args.sync_weight)
+    weights = [t[3] for t in traffic]
+    rng = random.Random(args.seed)
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+    deadline = time.perf_counter() + args.duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            kind, method, path, _ = rng.choices(traffic, weights=weights)[0]
+            _current_kind.set(kind)
+            started = time.perf_counter()
+            status, _ = await client.request(method, path)
+            latencies[kind].append(time.perf_counter() - started)
+            statuses[kind][status] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(asyncio.create_task(worker()) for _ in range(args.clients)))
+    elapsed = time.perf_counter() - started
+
+    return {'elapsed': elapsed, 'latencies': latencies, 'statuses': statuses, 'backend': backend}
+
+
+def _report(args, result: Dict[str, Any]):
+    latencies = result['latencies']
+    statuses = result['statuses']
+    backend = result['backend']
+    elapsed = result['elapsed']
+    total = sum(len(v) for v in latencies.values())
+
+    print(f"\nClients: {args.clients}  Duration: {elapsed:.1f}s  Upstream latency: {args.latency * 1000:.0f} ms  "
+          f"Quota error rate: {args.quota_error_rate:.1%}  Workbook: {args.months} months x {args.customers} customers")
+    print("-" * 96)
+    print(f"{'kind':<12}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'upstream/req':>14}  statuses")
+
+    rows = sorted(latencies) + ['ALL']
+    for kind in rows:
+        values = sorted(v for k in latencies for v in latencies[k]) if kind == 'ALL' else sorted(latencies[kind])
+        calls = sum(v for k, v in backend.calls.items() if k in latencies) if kind == 'ALL' else backend.calls.get(kind, 0)
+        if kind == 'ALL':
+            codes = defaultdict(int)
+            for k in statuses:
+                for code, count in statuses[k].items():
+                    codes[code] += count
+        else:
+            codes = statuses[kind]
+        print(f"{kind:<12}{len(values):>10}{len(values) / elapsed:>10.1f}"
+              f"{_percentile(values, 50) * 1000:>10.1f}{_percentile(values, 95) * 1000:>10.1f}"
+              f"{_percentile(values, 99) * 1000:>10.1f}{calls / max(len(values), 1):>14.2f}  "
+              + ' '.join(f"{code}:{count}" for code, count in sorted(codes.items())))
+
+    print("-" * 96)
+    print(f"Throughput: {total / elapsed:.1f} req/s  Upstream calls: {sum(backend.calls.values())} "
+          f"(warm-up {backend.calls.get('warmup', 0)})  Quota errors injected: {backend.quota_errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Finance Reports API against a fake Sheets backend")
+    parser.add_argument('--clients', type=int, default=20, help="concurrent clients")
+    parser.add_argument('--duration', type=float, default=30, help="test duration in seconds")
+    parser.add_argument('--latency', type=float, default=0.15, help="upstream latency per call in seconds")
+    parser.add_argument('--quota-error-rate', type=float, default=0.0, help="fraction of upstream calls failing with 429")
+    parser.add_argument('--months', type=int, default=12, help="months in the fake workbook")
+    parser.add_argument('--customers', type=int, default=300, help="outstanding entries per month")
+    parser.add_argument('--sync-weight', type=float, default=2, help="relative weight of sync requests in the mix")
+    parser.add_argument('--cold', action='store_true', help="start without an initial sync")
+    parser.add_argument('--seed', type=int, default=0, help="random seed for the workbook and traffic")
+    args = parser.parse_args()
+
+    result = asyncio.run(_run(args))
+    _report(args, result)
+
+
+if __name__ == '__main__':
+    main()
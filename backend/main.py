@@ -1,12 +1,20 @@
+import time
+
+# Taken before the heavier imports below so cold-start time includes them
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from typing import Optional
 from datetime import datetime
 import os
+import json
 
-from config import FRONTEND_URL, API_HOST, API_PORT
-from google_sheets import sheets_service
+from config import FRONTEND_URL, API_HOST, API_PORT, ZERO_COPY_RESPONSES
+from google_sheets import sheets_service, MONTH_TAB_RANGES
+from snapshot import snapshot_store
+from aging import drill_down
 from models import (
     ComparisonData, DashboardKPIs, SyncStatus,
     OutstandingSummary, SheetInfo
@@ -27,8 +35,57 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Store last sync time
-last_sync_time: Optional[datetime] = None
+# Seconds from module import to the app accepting requests
+cold_start_seconds: Optional[float] = None
+
+
+@app.on_event("startup")
+async def record_cold_start():
+    """Record how long the app took to become ready."""
+    global cold_start_seconds
+    cold_start_seconds = time.perf_counter() - _import_started
+    print(f"Cold start completed in {cold_start_seconds * 1000:.1f} ms")
+
+
+class MemoryViewResponse(Response):
+    """Response for a payload held as a memoryview into the snapshot file.
+
+    The ASGI spec requires response bodies to be bytes, so the view is copied
+    unless ZERO_COPY_RESPONSES is set. Only set it behind a server that accepts
+    buffers (uvicorn's h11 protocol; not guaranteed with httptools) and without
+    middleware that rewrites the body, such as GZip.
+    """
+    media_type = "application/json"
+
+    def render(self, content: memoryview):
+        return content if ZERO_COPY_RESPONSES else bytes(content)
+
+
+def _cached_response(section: str) -> Optional[Response]:
+    """Serve a section straight from the shared snapshot, if it has been synced."""
+    payload = snapshot_store.get_view(section)
+    if payload is None:
+        return None
+    return MemoryViewResponse(content=payload)
+
+
+def _snapshot_sections(data: dict) -> dict:
+    """Shape synced data the way each endpoint returns it."""
+    return {
+        'sheets': {"sheets": [s.dict() for s in data['sheets']]},
+        'dashboard': data['dashboard'].dict(),
+        'banks_comparison': data['banks_comparison'].dict(),
+        'advances_comparison': data['advances_comparison'].dict(),
+        'suspense_comparison': data['suspense_comparison'].dict(),
+        'outstanding_comparison': data['outstanding_comparison'],
+        'settings': data['settings'],
+        'aging': data['aging'],
+        **{
+            f'month/{month}/{name}': summary.dict()
+            for month, sections in data['months'].items()
+            for name, summary in sections.items()
+        }
+    }
 
 
 @app.get("/")
@@ -37,7 +94,8 @@ async def root():
     return {
         "status": "ok",
         "service": "Finance Reports API",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "cold_start_ms": round(cold_start_seconds * 1000, 1) if cold_start_seconds is not None else None
     }
 
 
@@ -70,29 +128,42 @@ async def connect_sheets():
 
 
 @app.post("/api/sync")
-async def sync_data():
+def sync_data():
     """Sync all data from Google Sheets."""
-    global last_sync_time
-
-    result = sheets_service.sync_all_data()
-
-    if result['success']:
-        last_sync_time = datetime.now()
-        return SyncStatus(
-            success=True,
-            message="Data synchronized successfully",
-            last_sync=last_sync_time,
-            sheets_loaded=result['sheets_loaded']
-        )
-    else:
-        raise HTTPException(status_code=500, detail=result.get('error', 'Sync failed'))
+    requested_at = datetime.now()
+
+    # Only one worker talks to Google Sheets at a time; the others wait and reuse its snapshot
+    with snapshot_store.sync_lock():
+        last_sync = snapshot_store.synced_at()
+        if last_sync and last_sync >= requested_at:
+            return SyncStatus(
+                success=True,
+                message="Data synchronized successfully",
+                last_sync=last_sync,
+                sheets_loaded=snapshot_store.sheets_loaded()
+            )
+
+        result = sheets_service.sync_all_data()
+
+        if result['success']:
+            last_sync = datetime.now()
+            snapshot_store.publish(_snapshot_sections(result['data']), last_sync, result['sheets_loaded'])
+            return SyncStatus(
+                success=True,
+                message="Data synchronized successfully",
+                last_sync=last_sync,
+                sheets_loaded=result['sheets_loaded']
+            )
+        else:
+            raise HTTPException(status_code=500, detail=result.get('error', 'Sync failed'))
 
 
 @app.get("/api/sync/status")
 async def sync_status():
     """Get last sync status."""
+    last_sync = snapshot_store.synced_at()
     return {
-        "last_sync": last_sync_time.isoformat() if last_sync_time else None,
+        "last_sync": last_sync.isoformat() if last_sync else None,
         "authenticated": sheets_service.is_authenticated()
     }
 
@@ -100,6 +171,10 @@ async def sync_status():
 @app.get("/api/sheets")
 async def get_sheets():
     """Get list of all sheets."""
+    cached = _cached_response('sheets')
+    if cached is not None:
+        return cached
+
     if not sheets_service.is_authenticated():
         raise HTTPException(status_code=401, detail="Not authenticated")
 
@@ -110,6 +185,10 @@ async def get_sheets():
 @app.get("/api/dashboard")
 async def get_dashboard():
     """Get dashboard KPIs."""
+    cached = _cached_response('dashboard')
+    if cached is not None:
+        return cached
+
     if not sheets_service.is_authenticated():
         raise HTTPException(status_code=401, detail="Not authenticated")
 
@@ -123,6 +202,10 @@ async def get_dashboard():
 @app.get("/api/comparison/banks")
 async def get_banks_comparison():
     """Get banks comparison data."""
+    cached = _cached_response('banks_comparison')
+    if cached is not None:
+        return cached
+
     if not sheets_service.is_authenticated():
         raise HTTPException(status_code=401, detail="Not authenticated")
 
@@ -136,6 +219,10 @@ async def get_banks_comparison():
 @app.get("/api/comparison/advances")
 async def get_advances_comparison():
     """Get advances comparison data."""
+    cached = _cached_response('advances_comparison')
+    if cached is not None:
+        return cached
+
     if not sheets_service.is_authenticated():
         raise HTTPException(status_code=401, detail="Not authenticated")
 
@@ -149,6 +236,10 @@ async def get_advances_comparison():
 @app.get("/api/comparison/suspense")
 async def get_suspense_comparison():
     """Get suspense comparison data."""
+    cached = _cached_response('suspense_comparison')
+    if cached is not None:
+        return cached
+
     if not sheets_service.is_authenticated():
         raise HTTPException(status_code=401, detail="Not authenticated")
 
@@ -162,6 +253,10 @@ async def get_suspense_comparison():
 @app.get("/api/comparison/outstanding")
 async def get_outstanding_comparison():
     """Get outstanding comparison data with salesmen breakdown."""
+    cached = _cached_response('outstanding_comparison')
+    if cached is not None:
+        return cached
+
     if not sheets_service.is_authenticated():
         raise HTTPException(status_code=401, detail="Not authenticated")
 
@@ -173,14 +268,137 @@ async def get_outstanding_comparison():
 
 
 @app.get("/api/outstanding/{month}")
-async def get_monthly_outstanding(month: str):
-    """Get outstanding data for a specific month."""
+def get_monthly_outstanding(
+    month: str,
+    salesman: Optional[str] = None,
+    area: Optional[str] = None,
+    min_balance: Optional[float] = None,
+    min_days: Optional[int] = Query(None, ge=0),
+    max_days: Optional[int] = Query(None, ge=0),
+    sort: Optional[str] = Query(None, pattern="^-?(balance|days)$"),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500)
+):
+    """Get outstanding data for a specific month, optionally filtered, sorted and paged."""
+    section = f'month/{month}/outstanding'
+    if snapshot_store.get_view(section) is None and not sheets_service.is_authenticated():
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    try:
+        index = sheets_service.get_outstanding_index(
+            month,
+            snapshot_store.version(),
+            published=lambda: snapshot_store.get(section)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if index is None:
+        raise HTTPException(status_code=404, detail=f"No data for month: {month}")
+
+    try:
+        page = index.query(
+            salesman=salesman,
+            area=area,
+            min_balance=min_balance,
+            min_days=min_days,
+            max_days=max_days,
+            sort=sort,
+            cursor=cursor,
+            limit=limit
+        )
+        return page.dict()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _bundle_response(month: str, payloads) -> Response:
+    """Join a month's section payloads into one JSON object."""
+    parts = [b'{"month": ' + json.dumps(month).encode('utf-8')]
+    for name, payload in payloads:
+        parts.append(b', "' + name.encode('utf-8') + b'": ' + payload)
+    parts.append(b'}')
+    return Response(content=b''.join(parts), media_type="application/json")
+
+
+def _month_bundle_section(month: str, section: Optional[str] = None) -> Response:
+    """Serve one section of a month's bundle, or the whole bundle if no section is given."""
+    names = [section] if section is not None else list(MONTH_TAB_RANGES)
+    views = snapshot_store.get_views([f'month/{month}/{name}' for name in names])
+    if views is not None:
+        if section is not None:
+            return MemoryViewResponse(content=views[0])
+        return _bundle_response(month, zip(names, views))
+
     if not sheets_service.is_authenticated():
         raise HTTPException(status_code=401, detail="Not authenticated")
 
     try:
-        data = sheets_service.get_monthly_outstanding(month)
-        return data.dict()
+        sheets = snapshot_store.get('sheets')
+        bundle = sheets_service.get_month_bundle(
+            month,
+            snapshot_store.version(),
+            [SheetInfo(**s) for s in sheets['sheets']] if sheets is not None else None
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if bundle is None:
+        raise HTTPException(status_code=404, detail=f"No data for month: {month}")
+
+    if section is not None:
+        return Response(content=bundle[section], media_type="application/json")
+    return _bundle_response(month, bundle.items())
+
+
+@app.get("/api/month/{month}")
+def get_month_bundle(month: str):
+    """Get all of a month's tabs (banks, advances, suspense, outstanding) at once."""
+    return _month_bundle_section(month)
+
+
+@app.get("/api/banks/{month}")
+def get_monthly_banks(month: str):
+    """Get bank details for a specific month."""
+    return _month_bundle_section(month, 'banks')
+
+
+@app.get("/api/advances/{month}")
+def get_monthly_advances(month: str):
+    """Get advance transactions for a specific month."""
+    return _month_bundle_section(month, 'advances')
+
+
+@app.get("/api/suspense/{month}")
+def get_monthly_suspense(month: str):
+    """Get suspense transactions for a specific month."""
+    return _month_bundle_section(month, 'suspense')
+
+
+@app.get("/api/aging")
+def get_aging(
+    month: Optional[str] = None,
+    salesman: Optional[str] = None,
+    area: Optional[str] = None
+):
+    """Get receivables aging buckets, optionally drilled down by month, salesman or area."""
+    if month is None and salesman is None and area is None:
+        cached = _cached_response('aging')
+        if cached is not None:
+            return cached
+
+    aging = snapshot_store.get('aging')
+    if aging is None and not sheets_service.is_authenticated():
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    try:
+        if aging is None:
+            aging = sheets_service.get_aging(version=snapshot_store.version())
+        if month is None and salesman is None and area is None:
+            return aging
+        return drill_down(aging, month=month, salesman=salesman, area=area)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -188,6 +406,10 @@ async def get_monthly_outstanding(month: str):
 @app.get("/api/settings")
 async def get_settings():
     """Get settings (banks, salesmen, areas lists)."""
+    cached = _cached_response('settings')
+    if cached is not None:
+        return cached
+
     if not sheets_service.is_authenticated():
         raise HTTPException(status_code=401, detail="Not authenticated")
 
@@ -201,11 +423,13 @@ async def get_settings():
 @app.get("/api/reports/salesman/{salesman}")
 async def get_salesman_report(salesman: str):
     """Get outstanding report for a specific salesman."""
-    if not sheets_service.is_authenticated():
+    outstanding = snapshot_store.get('outstanding_comparison')
+    if outstanding is None and not sheets_service.is_authenticated():
         raise HTTPException(status_code=401, detail="Not authenticated")
 
     try:
-        outstanding = sheets_service.get_outstanding_comparison()
+        if outstanding is None:
+            outstanding = sheets_service.get_outstanding_comparison()
         salesman_data = outstanding['salesmen'].get(salesman, [])
 
         return {
@@ -86,6 +86,11 @@ class OutstandingSummary(BaseModel):
     entries: List[OutstandingEntry]
 
 
+class OutstandingPage(OutstandingSummary):
+    matched: int
+    next_cursor: Optional[str] = None
+
+
 class ComparisonData(BaseModel):
     months: List[str]
     metrics: Dict[str, List[float]]
@@ -0,0 +1,142 @@
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import List, Dict, Optional
+
+from models import OutstandingSummary, OutstandingPage
+
+SORT_KEYS = ('balance', 'days')
+
+
+def _key(value: str) -> str:
+    """Normalize a salesman or area name for lookups."""
+    return value.strip().casefold()
+
+
+class OutstandingIndex:
+    """A month's outstanding entries, indexed for server-side filtering and sorting.
+
+    Balance and days each get a sorted index (entry positions in ascending order)
+    plus the matching sorted values for range lookups; salesman and area get hash
+    indexes from name to entry positions. `version` is the snapshot version the
+    data was read at; pagination cursors are only valid for that version.
+    """
+
+    def __init__(self, summary: OutstandingSummary, version: int = 0):
+        self.summary = summary
+        self.version = version
+        entries = summary.entries
+        positions = range(len(entries))
+
+        values = {
+            'balance': [e.balance for e in entries],
+            'days': [e.days for e in entries]
+        }
+        self._sorted: Dict[str, List[int]] = {
+            key: sorted(positions, key=values[key].__getitem__) for key in SORT_KEYS
+        }
+        self._sorted_values: Dict[str, List[float]] = {
+            key: [values[key][i] for i in self._sorted[key]] for key in SORT_KEYS
+        }
+        # Position of each entry within a sorted index, used to order small candidate sets
+        self._rank: Dict[str, List[int]] = {}
+        for key in SORT_KEYS:
+            rank = [0] * len(entries)
+            for r, i in enumerate(self._sorted[key]):
+                rank[i] = r
+            self._rank[key] = rank
+
+        self._by_salesman: Dict[str, List[int]] = defaultdict(list)
+        self._by_area: Dict[str, List[int]] = defaultdict(list)
+        for i, entry in enumerate(entries):
+            self._by_salesman[_key(entry.salesman)].append(i)
+            self._by_area[_key(entry.area)].append(i)
+
+    def _range(self, key: str, low: Optional[float], high: Optional[float]) -> List[int]:
+        """Entry positions with low <= value <= high, in ascending order of the key."""
+        values = self._sorted_values[key]
+        start = bisect_left(values, low) if low is not None else 0
+        end = bisect_right(values, high) if high is not None else len(values)
+        return self._sorted[key][start:end]
+
+    def query(
+        self,
+        salesman: Optional[str] = None,
+        area: Optional[str] = None,
+        min_balance: Optional[float] = None,
+        min_days: Optional[int] = None,
+        max_days: Optional[int] = None,
+        sort: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> OutstandingPage:
+        """Filter, sort and page the month's entries.
+
+        `sort` is a key from SORT_KEYS, prefixed with '-' for descending order.
+        `cursor` is the `next_cursor` returned by the previous page; a cursor from
+        before a sync is rejected, since its offset no longer lines up with the data.
+        """
+        descending = bool(sort) and sort.startswith('-')
+        sort_key = sort.lstrip('-') if sort else None
+        if sort_key is not None and sort_key not in SORT_KEYS:
+            raise ValueError(f"Invalid sort key: {sort}")
+
+        offset = 0
+        if cursor:
+            try:
+                version, offset = (int(part) for part in cursor.split(':'))
+            except ValueError:
+                raise ValueError(f"Invalid cursor: {cursor}")
+            if offset < 0:
+                raise ValueError(f"Invalid cursor: {cursor}")
+            if version != self.version:
+                raise ValueError("Cursor is from data that has since been re-synced; start again from the first page")
+
+        entries = self.summary.entries
+
+        # Narrow down with the hash indexes first, starting from the smaller list
+        candidates = None
+        for index, name in ((self._by_salesman, salesman), (self._by_area, area)):
+            if name is None:
+                continue
+            matches = index.get(_key(name), [])
+            candidates = set(matches) if candidates is None else candidates.intersection(matches)
+
+        if candidates is not None:
+            positions = [
+                i for i in candidates
+                if (min_balance is None or entries[i].balance >= min_balance)
+                and (min_days is None or entries[i].days >= min_days)
+                and (max_days is None or entries[i].days <= max_days)
+            ]
+            positions.sort(key=self._rank[sort_key].__getitem__ if sort_key else None)
+        elif sort_key == 'days' or (sort_key is None and (min_days is not None or max_days is not None)):
+            positions = [
+                i for i in self._range('days', min_days, max_days)
+                if min_balance is None or entries[i].balance >= min_balance
+            ]
+            if sort_key is None:
+                positions.sort()
+        else:
+            positions = [
+                i for i in self._range('balance', min_balance, None)
+                if (min_days is None or entries[i].days >= min_days)
+                and (max_days is None or entries[i].days <= max_days)
+            ]
+            if sort_key is None:
+                positions.sort()
+
+        if descending:
+            positions.reverse()
+
+        end = offset + limit if limit is not None else len(positions)
+        page = positions[offset:end]
+
+        return OutstandingPage(
+            month=self.summary.month,
+            salesman_summary=self.summary.salesman_summary,
+            total_outstanding=self.summary.total_outstanding,
+            total_customers=self.summary.total_customers,
+            entries=[entries[i] for i in page],
+            matched=len(positions),
+            next_cursor=f"{self.version}:{end}" if end < len(positions) else None
+        )
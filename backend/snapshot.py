@@ -0,0 +1,181 @@
+import os
+import json
+import mmap
+import struct
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple, NamedTuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to locking within this process only
+    fcntl = None
+
+from config import GOOGLE_SHEET_ID, SNAPSHOT_DIR
+
+# File layout: <index length><JSON index><section payloads...>
+# The index maps each section name to the (offset, length) of its JSON payload,
+# with offsets relative to the first byte after the index.
+_HEADER = struct.Struct('<Q')
+
+
+class _MappedSnapshot(NamedTuple):
+    file_id: Tuple[int, int]
+    data: Optional[mmap.mmap]
+    index: Dict[str, Any]
+    data_start: int
+
+
+_EMPTY = _MappedSnapshot(file_id=(0, 0), data=None, index={}, data_start=0)
+
+
+class SnapshotStore:
+    """Synced data shared by every worker process through one memory-mapped file.
+
+    Whichever worker runs a sync writes a new immutable snapshot file and swaps it
+    in with an atomic rename. Readers map the current file read-only and serve
+    the pre-serialized section payloads straight from the shared page cache, so
+    extra workers add neither upstream calls nor another copy of the data.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, 'snapshot.bin')
+        self.lock_path = os.path.join(directory, 'sync.lock')
+        self._thread_lock = threading.Lock()
+        # Swapped as a whole so concurrent readers never mix index and data
+        self._current = _EMPTY
+        os.makedirs(directory, exist_ok=True)
+
+    def _refresh(self) -> _MappedSnapshot:
+        """Map the current snapshot file if it has been swapped since the last read."""
+        current = self._current
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return current
+
+        if (st.st_dev, st.st_ino) == current.file_id:
+            return current
+
+        with open(self.path, 'rb') as f:
+            # Identify the file we actually opened, which may be newer than the stat above
+            opened = os.fstat(f.fileno())
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (index_length,) = _HEADER.unpack_from(data, 0)
+        index = json.loads(data[_HEADER.size:_HEADER.size + index_length])
+
+        if index.get('sheet_id') != GOOGLE_SHEET_ID:
+            # Left over from a different spreadsheet; never serve it
+            index = {}
+
+        # Older maps are released once no reader holds a reference to them
+        current = _MappedSnapshot(
+            file_id=(opened.st_dev, opened.st_ino),
+            data=data,
+            index=index,
+            data_start=_HEADER.size + index_length
+        )
+        self._current = current
+        return current
+
+    def get_view(self, section: str) -> Optional[memoryview]:
+        """Get a section's JSON payload as a zero-copy view into the mapped file."""
+        current = self._refresh()
+        location = current.index.get('sections', {}).get(section)
+        if location is None:
+            return None
+
+        offset, length = location
+        start = current.data_start + offset
+        return memoryview(current.data)[start:start + length]
+
+    def get_views(self, sections: List[str]) -> Optional[List[memoryview]]:
+        """Get several sections from the same snapshot, or None unless it has all of them."""
+        current = self._refresh()
+        locations = current.index.get('sections', {})
+        if not all(section in locations for section in sections):
+            return None
+
+        views = []
+        for section in sections:
+            offset, length = locations[section]
+            start = current.data_start + offset
+            views.append(memoryview(current.data)[start:start + length])
+        return views
+
+    def get_bytes(self, section: str) -> Optional[bytes]:
+        """Get a copy of a section's JSON payload, or None if it is not in the snapshot."""
+        view = self.get_view(section)
+        return bytes(view) if view is not None else None
+
+    def get(self, section: str) -> Optional[Any]:
+        """Get the decoded payload of a section, or None if it is not in the snapshot."""
+        payload = self.get_bytes(section)
+        return json.loads(payload) if payload is not None else None
+
+    def synced_at(self) -> Optional[datetime]:
+        """Time the current snapshot was synced, if there is one."""
+        synced_at = self._refresh().index.get('synced_at')
+        return datetime.fromisoformat(synced_at) if synced_at else None
+
+    def sheets_loaded(self) -> int:
+        """Number of sheets the current snapshot was built from."""
+        return self._refresh().index.get('sheets_loaded', 0)
+
+    def version(self) -> int:
+        """Monotonic version of the current snapshot (0 if none has been published)."""
+        return self._refresh().index.get('version', 0)
+
+    @contextmanager
+    def sync_lock(self):
+        """Hold the sync lock shared by all worker processes."""
+        with self._thread_lock:
+            with open(self.lock_path, 'a') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def publish(self, sections: Dict[str, Any], synced_at: datetime, sheets_loaded: int = 0) -> int:
+        """Write a new snapshot and atomically make it the current one.
+
+        Should be called while holding sync_lock() so versions stay monotonic.
+        """
+        payloads = {name: json.dumps(value).encode('utf-8') for name, value in sections.items()}
+        version = self.version() + 1
+
+        locations = {}
+        offset = 0
+        for name, payload in payloads.items():
+            locations[name] = [offset, len(payload)]
+            offset += len(payload)
+
+        index_bytes = json.dumps({
+            'version': version,
+            'sheet_id': GOOGLE_SHEET_ID,
+            'synced_at': synced_at.isoformat(),
+            'sheets_loaded': sheets_loaded,
+            'sections': locations
+        }).encode('utf-8')
+
+        tmp_path = os.path.join(self.directory, f'.snapshot-{version}-{os.getpid()}.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(len(index_bytes)))
+            f.write(index_bytes)
+            for payload in payloads.values():
+                f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp_path, self.path)
+        return version
+
+
+# Singleton instance
+snapshot_store = SnapshotStore(SNAPSHOT_DIR)